@@ -1,6 +1,5 @@
 import streamlit as st
-import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
 
 try:
     from database import get_appointments_for_date
@@ -15,60 +14,70 @@ st.set_page_config(
     page_icon="📅"
 )
 
+@st.cache_data(ttl=60)
+def _load_schedule_rows(target_date: date) -> list[dict]:
+    """
+    Fetches and formats the schedule for a date, cached across reruns.
+
+    The cache (keyed on the date, 60s TTL) means widget interactions that
+    don't change the date skip the DB round-trip entirely. For a day's worth
+    of rows, plain Python sorting and slicing beats building a DataFrame:
+    the stored ISO strings sort chronologically and already contain the
+    HH:MM portion at a fixed offset.
+    Returns an empty list if there are no appointments.
+    """
+    appointments_list = get_appointments_for_date(target_date)
+    rows = sorted(appointments_list, key=lambda r: r['appointment_datetime'])
+    return [
+        {
+            'Time': r['appointment_datetime'][11:16],
+            'Client Name': r['client_name'],
+            'Duration (min)': r['duration_minutes'],
+            'Client Email': r['email'],
+        }
+        for r in rows
+    ]
+
 # --- Sidebar (for future actions) ---
 st.sidebar.title("Admin Actions")
 st.sidebar.info("Currently view-only. Future actions like blocking time will be added here.")
+if st.sidebar.button("Refresh schedule"):
+    _load_schedule_rows.clear()
 
 # --- Main Page Content ---
 st.title("📅 Appointment Schedule Viewer")
 st.markdown("Select a date to view the scheduled appointments.")
 
-# --- Date Selector ---
-selected_date = st.date_input("Select Date", value=datetime.now().date())
+@st.fragment
+def _schedule_section():
+    """
+    Date selector plus schedule table, isolated as a fragment so picking a
+    date reruns only this block instead of the whole script (sidebar,
+    header and page config stay untouched).
+    """
+    selected_date = st.date_input("Select Date", value=datetime.now().date())
+
+    if not selected_date:
+        st.warning("Please select a date.")
+        return
 
-# --- Display Schedule for Selected Date ---
-if selected_date:
     st.subheader(f"Schedule for: {selected_date.strftime('%A, %B %d, %Y')}")
 
     try:
-        # Fetch data using the new database function
-        appointments_list = get_appointments_for_date(selected_date)
+        # Fetch data through the cached loader (keyed on selected_date)
+        display_rows = _load_schedule_rows(selected_date)
 
-        if not appointments_list:
+        if not display_rows:
             st.info("No appointments scheduled for this date.")
         else:
-            df = pd.DataFrame(appointments_list)
-
-            # --- Data Processing for Display ---
-            # 1. Convert ISO string datetime to actual datetime objects
-            #    Handle potential errors if data is malformed
-            try:
-                df['appointment_datetime_obj'] = pd.to_datetime(df['appointment_datetime'])
-            except Exception as e:
-                st.error(f"Error processing appointment times: {e}. Displaying raw data.")
-                st.dataframe(df) # Show raw data if conversion fails
-                st.stop()
-
-            # 2. Create columns for display (Time, Client, Duration)
-            df_display = pd.DataFrame({
-                'Time': df['appointment_datetime_obj'].dt.strftime('%H:%M'), # Format time
-                'Client Name': df['client_name'],
-                'Duration (min)': df['duration_minutes'],
-                'Client Email': df['email']
-            })
-
-            # 3. Sort by time just to be sure
-            df_display = df_display.sort_values(by='Time').reset_index(drop=True)
-
             st.dataframe(
-                df_display,
+                display_rows,
                 use_container_width=True, # Use full width
-                hide_index=True # Don't show pandas index
+                hide_index=True # Don't show the row index
             )
 
     except Exception as e:
         st.error("An error occurred while trying to load the schedule.")
         st.exception(e)
 
-else:
-    st.warning("Please select a date.")
\ No newline at end of file
+_schedule_section()
\ No newline at end of file
@@ -1,78 +1,146 @@
 import os
+import re
 
 from langchain.agents import (AgentExecutor, create_openai_tools_agent,
                               create_react_agent)
-from langchain.memory import ConversationBufferMemory
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain.memory import ConversationSummaryBufferMemory
 
 from llm_setup import get_llm
+from prompts import prompt_openai, prompt_react
+from tools import (book_appointment, check_availability,
+                   get_professional_info, list_client_appointments)
 from tools import \
     tools  # The list of exposed tools (check_availability, book_appointment, list_appointments, get_professional_info)
-_BASE_PROMPT = """
-    You are 'AppointmentBot', a friendly and efficient assistant for booking appointments. Your goal is to help users find and book available time slots or retrieve information based on their requests.
-
-    Key Objectives:
-    - Understand User Intent: Evaluate what the user wants to achieve and suggest the appropriate tools and actions.
-    - Provide Relevant Information: Use the available tools to fetch and provide the information the user needs.
-    - Handle Appointments: Assist with booking, editing, canceling, and retrieving appointments.
-
-    Tools and Their Uses:
-    1. get_datetime: Use this tool to know the current date and time.
-    2. get_professional_info: Provide information about services, prices, payment, location, or general info about the professional.
-    3. list_appointments: Retrieve existing bookings for a user. Requires the client's name.
-    4. edit_appointment: Change or reschedule an existing appointment. Requires the client's name, current datetime, and new datetime in 'YYYY-MM-DD HH:MM' format.
-    5. cancel_appointment: Cancel a previously booked appointment. Requires the exact timeslot in 'YYYY-MM-DD HH:MM' format and the client's name.
-    6. check_availability: Check availability for new appointments. Requires a specific date query (e.g., 'today', 'tomorrow', 'YYYY-MM-DD', 'next Monday'). Use it when you have to book a new appointment or edit an exsisting one.
-    7. book_appointment: Book a new appointment. Requires the exact datetime string, client's name, and client's email.
-
-    Guidelines:
-    - Greet and Assist: Greet the user and ask how you can help.
-    - Evaluate Intent: Based on the user's request, determine the appropriate tool to use.
-    - Clarify Information: If the user's request is vague (e.g., 'next week'), clarify the specifics (e.g., 'Which day next week?').
-    - Confirm Actions: Before performing any action, confirm the details with the user.
-    - Handle Errors: If a tool fails or returns an error, inform the user clearly and suggest alternative actions.
-    - Maintain Context: Keep track of the conversation history to avoid asking for the same information repeatedly.
-
-    Example Scenarios:
-    - Information Request: If the user asks about services or general info, use the get_professional_info tool.
-    - Retrieve Bookings: If the user wants to see their existing bookings, use the list_appointments tool.
-    - Edit Appointment: If the user wants to change an appointment, gather the necessary details and use the edit_appointment tool.
-    - Cancel Appointment: If the user wants to cancel an appointment, use the cancel_appointment tool.
-    - Check Availability: If the user asks for available slots, use the check_availability tool.
-    - Book Appointment: If the user wants to book a new appointment, gather the necessary details and use the book_appointment tool.
-
-    Important Notes:
-    - Do not make up information. Rely only on the tools provided and these instructions.
-    - Ensure you have all required information before calling a tool.
+
+# Intents these patterns match don't need an LLM to classify; compiled once
+# at import so the per-message cost is a couple of regex searches. All of
+# them are anchored to the whole message: a keyword inside a longer sentence
+# ("can I book at your location?", "show my appointments and cancel one")
+# is not deterministic and must fall through to the agent.
+_INFO_RE = re.compile(
+    r"(?i)^\s*(?:what (?:are|is) (?:your|the) |which |do you (?:have|offer|take) |"
+    r"tell me (?:about )?(?:your |the )?|how much (?:are|is) (?:your|the) |"
+    r"where is (?:your |the )?)?"
+    r"(?:services?|prices?|costs?|location|payment(?: (?:info|information|options?|methods?))?)"
+    r"\s*[.?!]*\s*$")
+_LIST_RE = re.compile(
+    r"(?i)^\s*(?:please )?(?:list|show(?: me)?|view|see)(?: all)?(?: my)?"
+    r" appointments?\s*[.?!]*\s*$")
+# Canonical formats the /help text itself teaches users, e.g.
+# "Book 2025-07-15 14:00" or "slots for 2025-07-15".
+_BOOK_RE = re.compile(r"(?i)^\s*book\s+(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2})\s*$")
+_SLOTS_RE = re.compile(
+    r"(?i)^\s*(?:see\s+|check\s+)?(?:slots?|availability)\s+(?:for\s+)?(\d{4}-\d{2}-\d{2})\s*$")
+
+
+class SlotMemory:
+    """Structured memory of tool arguments the user has already provided.
+
+    Chat history alone makes the agent re-ask for client_name/email on most
+    turns. After each turn the tool-call arguments are harvested from the
+    intermediate steps; the known values are injected back into the prompt as
+    one compact line so the agent can pre-fill them. Read-only for the LLM.
+    """
+
+    _TRACKED = ("client_name", "client_email")
+
+    def __init__(self):
+        self.slots = {"client_name": None, "client_email": None,
+                      "last_viewed_date": None}
+
+    def update_from_steps(self, intermediate_steps):
+        """Harvests known argument values from a turn's (action, observation) steps."""
+        for action, _observation in intermediate_steps or []:
+            tool_input = getattr(action, "tool_input", None)
+            if not isinstance(tool_input, dict):
+                continue # ReAct agents may pass plain strings; nothing to harvest
+            for key in self._TRACKED:
+                value = tool_input.get(key)
+                if value:
+                    self.slots[key] = value
+            if tool_input.get("date_query"):
+                self.slots["last_viewed_date"] = tool_input["date_query"]
+
+    def summary_line(self) -> str:
+        """Returns a compact 'Known: ...' line, or an empty string if nothing is known."""
+        known = {k: v for k, v in self.slots.items() if v}
+        if not known:
+            return ""
+        return "Known: " + ", ".join(f"{k}={v}" for k, v in known.items())
+
+
+class DeterministicRouter:
+    """Answers trivially classifiable turns by calling the tool directly.
+
+    A full agent loop re-sends the system prompt and every tool schema just
+    to decide that "what are your prices?" means get_professional_info.
+    This wrapper checks a couple of compiled patterns first and only
+    delegates to the wrapped AgentExecutor when no pattern matches, saving
+    an LLM round-trip on those turns.
+
+    The router holds no per-chat state: one instance is shared by all chats
+    and the caller passes the chat's SlotMemory per invocation, with the
+    chat history travelling inside `inputs`.
+    """
+
+    def __init__(self, executor: AgentExecutor):
+        self._executor = executor
+
+    def _try_route(self, inputs: dict, slot_memory):
+        """Returns a response dict for deterministic intents, else None."""
+        text = (inputs.get("input") or "").strip()
+        book_match = _BOOK_RE.match(text)
+        slots_match = _SLOTS_RE.match(text)
+        if book_match:
+            # Booking still needs name + email; only route when both are
+            # already known, otherwise the agent has to ask for them.
+            client_name = slot_memory.slots.get("client_name") if slot_memory else None
+            client_email = slot_memory.slots.get("client_email") if slot_memory else None
+            if not (client_name and client_email):
+                return None
+            output = book_appointment.func(book_match.group(1), client_name, client_email)
+        elif slots_match:
+            output = check_availability.func(slots_match.group(1))
+        elif _INFO_RE.search(text):
+            output = get_professional_info.func()
+        elif _LIST_RE.search(text):
+            client_name = slot_memory.slots.get("client_name") if slot_memory else None
+            if not client_name:
+                return None # Don't know who is asking; let the agent clarify
+            output = list_client_appointments.func(client_name)
+        else:
+            return None
+
+        return {"output": output, "intermediate_steps": []}
+
+    def invoke(self, inputs: dict, slot_memory=None, **kwargs):
+        routed = self._try_route(inputs, slot_memory)
+        if routed is not None:
+            return routed
+        return self._executor.invoke(inputs, **kwargs)
+
+    async def ainvoke(self, inputs: dict, slot_memory=None, **kwargs):
+        routed = self._try_route(inputs, slot_memory)
+        if routed is not None:
+            return routed
+        return await self._executor.ainvoke(inputs, **kwargs)
+
+
+def create_memory(llm=None):
+    """Creates a new conversation memory with bounded token growth.
+
+    Older turns are folded into a running summary while recent turns stay
+    verbatim, so per-turn context (and cost) stops growing with conversation
+    length. The summarizer LLM defaults to the configured model; pass an
+    already-initialized instance to avoid re-creating one per chat.
     """
-# Define the prompt template for the OpenAI Tools Agent (remains the same)
-# This prompt structure is specific to how create_openai_tools_agent works.
-prompt_openai = ChatPromptTemplate.from_messages([
-    ("system", _BASE_PROMPT),
-    MessagesPlaceholder(variable_name="chat_history"),
-    ("user", "{input}"),
-    # 'agent_scratchpad' for OpenAI tools agent stores intermediate steps like function calls/responses
-    MessagesPlaceholder(variable_name="agent_scratchpad"),
-])
-
-
-# Define the prompt template suitable for ReAct Agent
-# ReAct relies heavily on the LLM understanding the Thought/Action/Action Input/Observation cycle.
-# Often, using a pre-defined ReAct prompt structure is best. We can pull one from the LangChain Hub.
-# This prompt includes placeholders for tools, tool_names, input, and agent_scratchpad (for the T/A/AI/O steps)
-# If hub access is an issue, a custom string-based template following ReAct format would be the alternative.
-try:
-    from langchain import hub
-
-    # This prompt structure is designed to guide the LLM through the ReAct steps.
-    prompt_react = hub.pull("hwchase17/react-chat")
-except ImportError:
-    print("Warning: `langchain.hub` not available. ReAct agent might not function optimally without a tailored prompt.")
-    prompt_react = None 
-
-def create_memory():
-    """Creates a new conversation memory buffer."""
-    return ConversationBufferMemory(memory_key="chat_history", return_messages=True, return_intermediate_steps=True) # return_intermediate_steps might be useful for ReAct debugging
+    return ConversationSummaryBufferMemory(
+        llm=llm or get_llm(),
+        max_token_limit=400,
+        memory_key="chat_history",
+        return_messages=True,
+        return_intermediate_steps=True, # return_intermediate_steps might be useful for ReAct debugging
+    )
 
 def create_agent_executor(llm):
     """Creates the LangChain agent executor instance based on MODEL_PROVIDER."""
@@ -96,15 +164,18 @@ def create_agent_executor(llm):
             raise ValueError("Could not create ReAct agent because the prompt is unavailable.")
 
     # Combine Agent + Tools + Memory into an Executor
-    # verbose=True is highly recommended for debugging ReAct agents to see the Thought process
+    # Verbose tracing prints every Thought/Action/Observation to stdout, which
+    # is synchronous I/O on each turn; keep it off unless explicitly enabled
+    # for debugging via AGENT_VERBOSE=1 (recommended when debugging ReAct).
     print("Creating Agent Executor...")
     agent_executor = AgentExecutor(
         agent=agent,
         tools=tools,
-        verbose=True, # Set to True to see Thoughts, Actions, Observations
-        handle_parsing_errors=True # Gracefully handle cases where the LLM output doesn't perfectly match the expected format
+        verbose=os.getenv("AGENT_VERBOSE", "0") == "1",
+        handle_parsing_errors=True, # Gracefully handle cases where the LLM output doesn't perfectly match the expected format
+        return_intermediate_steps=True # Needed so SlotMemory can harvest tool arguments per turn
     )
     # Note: We are not explicitly passing memory here. It will be managed per-chat
     # in the main.py `get_agent_for_chat` function by assigning agent_executor.memory.
 
-    return agent_executor
\ No newline at end of file
+    return DeterministicRouter(agent_executor)
\ No newline at end of file
@@ -1,6 +1,15 @@
+import logging
 import os
+import queue
 import sqlite3
+import threading
+import time as time_module
+from contextlib import contextmanager
 from datetime import date, datetime, time, timedelta
+from enum import Enum, auto
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
 
 DATABASE_FILE = "appointments.db"
 APPOINTMENT_DURATION_MINUTES = int(os.getenv("APPOINTMENT_DURATION_MINUTES", 60))
@@ -16,133 +25,259 @@ WORKING_HOURS = {
     # 6: None, # Sunday - Off
 }
 
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect(DATABASE_FILE)
+def _build_weekday_slot_times() -> dict[int, tuple[time, ...]]:
+    """Derives the fixed slot-start times for each working weekday."""
+    slot_duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
+    anchor = date(2000, 1, 3)  # Arbitrary date; only the times matter
+    templates = {}
+    for day, (start_time, end_time) in WORKING_HOURS.items():
+        slot_dt = datetime.combine(anchor, start_time)
+        end_dt = datetime.combine(anchor, end_time)
+        slot_times = []
+        while slot_dt + slot_duration <= end_dt:
+            slot_times.append(slot_dt.time())
+            slot_dt += slot_duration
+        templates[day] = tuple(slot_times)
+    return templates
+
+# WORKING_HOURS and the appointment duration are fixed for the process, so
+# the per-weekday slot grid is derived once at import instead of being
+# recomputed on every availability check. The preformatted 'HH:MM:SS'
+# labels let candidate ISO strings be built by concatenation alone.
+WEEKDAY_SLOT_TIMES = _build_weekday_slot_times()
+WEEKDAY_SLOT_LABELS = {
+    day: tuple(t.strftime("%H:%M:%S") for t in slot_times)
+    for day, slot_times in WEEKDAY_SLOT_TIMES.items()
+}
+
+# A small process-wide pool of open connections instead of one per thread.
+# Connections are expensive to open (file open, page-cache warmup) and the
+# Telegram handlers run tool calls from worker threads, so a shared pool
+# keeps SQLite's cache hot across chats while bounding the handle count.
+_POOL_SIZE = 5
+_POOL: queue.Queue = queue.Queue(maxsize=_POOL_SIZE)
+
+def _make_connection() -> sqlite3.Connection:
+    """Opens a new pooled connection with the standard pragmas applied."""
+    conn = sqlite3.connect(DATABASE_FILE, check_same_thread=False)
     conn.row_factory = sqlite3.Row # Return rows as dictionary-like objects
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456") # Read pages via mmap (256 MiB cap)
+    conn.execute("PRAGMA busy_timeout=5000")   # Wait for writer locks instead of failing
     return conn
 
+@contextmanager
+def get_conn():
+    """Checks a connection out of the pool for the duration of a with-block.
+
+    Connections are created lazily on first demand; if the pool is full when
+    a connection comes back (more than _POOL_SIZE concurrent users), the
+    surplus connection is simply closed.
+    """
+    try:
+        conn = _POOL.get_nowait()
+    except queue.Empty:
+        conn = _make_connection()
+    try:
+        yield conn
+    finally:
+        try:
+            _POOL.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
 def initialize_database():
     """Creates the appointments table if it doesn't exist."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS appointments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            client_name TEXT NOT NULL,
-            appointment_datetime TEXT NOT NULL UNIQUE, -- ISO format YYYY-MM-DDTHH:MM:SS
-            duration_minutes INTEGER NOT NULL,
-            booked_at TEXT NOT NULL,
-            email TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-    print("Database initialized.")
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        # Pure-read guard: CREATE ... IF NOT EXISTS still takes a write lock
+        # even when everything exists, so skip the DDL on the common restart
+        # path where the schema is already in place. The count covers the
+        # table AND both indexes, so databases created before the indexes
+        # existed still get them on the next start.
+        cursor.execute("""
+            SELECT COUNT(*) FROM sqlite_master
+            WHERE (type='table' AND name='appointments')
+               OR (type='index' AND name IN ('idx_appt_dt', 'idx_appt_client_dt'))
+        """)
+        if cursor.fetchone()[0] == 3:
+            logger.debug("Database already initialized; skipping DDL.")
+            return
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS appointments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_name TEXT NOT NULL,
+                appointment_datetime TEXT NOT NULL UNIQUE, -- ISO format YYYY-MM-DDTHH:MM:SS
+                duration_minutes INTEGER NOT NULL,
+                booked_at TEXT NOT NULL,
+                email TEXT
+            )
+        """)
+        # Explicit indexes: the day-range scans in get_booked_slots and the
+        # client lookups in list_appointments/update_appointment_in_db would
+        # otherwise degrade to full table scans as the table grows.
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_appt_dt
+            ON appointments(appointment_datetime)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_appt_client_dt
+            ON appointments(client_name, appointment_datetime)
+        """)
+        conn.commit()
+    logger.info("Database initialized.")
 
 def get_booked_slots(start_date: datetime, end_date: datetime) -> set:
     """Retrieves booked appointment datetimes within a given range."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # Query appointments that *start* within the range
-    cursor.execute("""
-        SELECT appointment_datetime FROM appointments
-        WHERE appointment_datetime >= ? AND appointment_datetime < ?
-    """, (start_date.isoformat(), end_date.isoformat()))
-    booked_slots = {row['appointment_datetime'] for row in cursor.fetchall()}
-    conn.close()
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        # Query appointments that *start* within the range
+        cursor.execute("""
+            SELECT appointment_datetime FROM appointments
+            WHERE appointment_datetime >= ? AND appointment_datetime < ?
+        """, (start_date.isoformat(), end_date.isoformat()))
+        booked_slots = {row['appointment_datetime'] for row in cursor.fetchall()}
     return booked_slots
 
+# Availability for a date is often requested several times within one
+# conversation; serve repeats from a short-lived cache so only the first
+# request in a burst hits the DB. Writes invalidate the affected date(s).
+# Tool calls run on worker threads, so access goes through a lock.
+_AVAIL_CACHE: dict[date, tuple[float, list[str]]] = {}
+_AVAIL_CACHE_TTL_SECONDS = 10
+_AVAIL_CACHE_LOCK = threading.Lock()
+
+def _avail_cache_get(target_date: date):
+    """Returns the cached slot list for a date, or None if missing/stale."""
+    with _AVAIL_CACHE_LOCK:
+        entry = _AVAIL_CACHE.get(target_date)
+    if entry and time_module.monotonic() - entry[0] < _AVAIL_CACHE_TTL_SECONDS:
+        return entry[1]
+    return None
+
+def _avail_cache_put(target_date: date, slots: list[str]):
+    with _AVAIL_CACHE_LOCK:
+        _AVAIL_CACHE[target_date] = (time_module.monotonic(), slots)
+
+def _avail_cache_invalidate(*iso_datetimes: str):
+    """Drops cached availability for the dates of the given ISO timestamps."""
+    with _AVAIL_CACHE_LOCK:
+        for dt_iso in iso_datetimes:
+            try:
+                _AVAIL_CACHE.pop(date.fromisoformat(dt_iso[:10]), None)
+            except ValueError:
+                _AVAIL_CACHE.clear() # Unparseable key; drop everything to stay safe
+
+@lru_cache(maxsize=64)
+def _candidate_slots(target_date: date) -> tuple[str, ...]:
+    """Returns the candidate slot-start ISO strings for a date.
+
+    The grid is a pure function of the date (weekday template + date), so a
+    small LRU means repeatedly-queried days skip even the string building.
+    The booked set is deliberately NOT cached here; it changes with every
+    booking.
+    """
+    slot_labels = WEEKDAY_SLOT_LABELS.get(target_date.weekday())
+    if not slot_labels:
+        return () # Not a working day
+    # Concatenate the date prefix with the preformatted time labels; this
+    # matches datetime.combine(...).isoformat() without any datetime work.
+    prefix = target_date.isoformat() + "T"
+    return tuple(prefix + label for label in slot_labels)
+
 def find_available_slots(target_date: datetime) -> list[str]:
     """Finds available slots for a specific date based on working hours and booked slots."""
-    available_slots = []
-    day_of_week = target_date.weekday()
-
-    if day_of_week not in WORKING_HOURS:
+    cached = _avail_cache_get(target_date.date())
+    if cached is not None:
+        return cached
+
+    # Grid of candidate slot starts, in the same ISO form the DB stores;
+    # SQLite is then asked which of them are taken. Staying in string space
+    # avoids parsing every booked row back through datetime.fromisoformat.
+    # Basic check, doesn't account for appointments overlapping the start time
+    # A more robust check would consider the duration of booked slots as well
+    candidates = _candidate_slots(target_date.date())
+    if not candidates:
         return [] # Not a working day
-
-    start_time, end_time = WORKING_HOURS[day_of_week]
-    slot_duration = timedelta(minutes=APPOINTMENT_DURATION_MINUTES)
-
-    # Get booked slots for the entire target day
-    day_start = datetime.combine(target_date.date(), time(0, 0))
-    day_end = day_start + timedelta(days=1)
-    booked_slots_iso = get_booked_slots(day_start, day_end)
-    booked_slot_datetimes = {datetime.fromisoformat(s) for s in booked_slots_iso}
-
-    current_slot_start_dt = datetime.combine(target_date.date(), start_time)
-    end_of_work_dt = datetime.combine(target_date.date(), end_time)
-
-    while current_slot_start_dt + slot_duration <= end_of_work_dt:
-        # Check if this potential slot is already booked
-        if current_slot_start_dt not in booked_slot_datetimes:
-            # Basic check, doesn't account for appointments overlapping the start time
-            # A more robust check would consider the duration of booked slots as well
-            available_slots.append(current_slot_start_dt.isoformat(sep=' ', timespec='minutes')) # Format YYYY-MM-DD HH:MM
-
-        current_slot_start_dt += slot_duration
-
+    placeholders = ",".join("?" * len(candidates))
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT appointment_datetime FROM appointments
+            WHERE appointment_datetime IN ({placeholders})
+        """, candidates)
+        taken = {row['appointment_datetime'] for row in cursor.fetchall()}
+    # 'YYYY-MM-DDTHH:MM:SS' -> 'YYYY-MM-DD HH:MM'
+    available_slots = [
+        iso[:16].replace('T', ' ') for iso in sorted(set(candidates) - taken)
+    ]
+    _avail_cache_put(target_date.date(), available_slots)
     return available_slots
 
 
 def add_appointment(client_name: str, appointment_dt: datetime, client_email: str) -> bool:
     """Adds a new appointment to the database after checking for conflicts."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
     appointment_iso = appointment_dt.isoformat()
     duration = APPOINTMENT_DURATION_MINUTES
     booked_at_iso = datetime.now().isoformat()
 
-    try:
-        # Check for conflict again just before inserting
-        cursor.execute("SELECT id FROM appointments WHERE appointment_datetime = ?", (appointment_iso,))
-        if cursor.fetchone():
-            print(f"Conflict detected for {appointment_iso} during add operation.")
-            conn.close()
-            return False # Slot is already booked
-
-        cursor.execute("""
-            INSERT INTO appointments (client_name, appointment_datetime, duration_minutes, booked_at, email)
-            VALUES (?, ?, ?, ?, ?)
-        """, (client_name, appointment_iso, duration, booked_at_iso, client_email))
-        conn.commit()
-        conn.close()
-        print(f"Appointment added for {client_name} at {appointment_iso}")
-        return True
-    except sqlite3.IntegrityError:
-        # Handles the UNIQUE constraint violation, though the check above should prevent it
-        print(f"IntegrityError: Slot {appointment_iso} likely already exists.")
-        conn.close()
-        return False
-    except Exception as e:
-        print(f"Error adding appointment: {e}")
-        conn.rollback() # Rollback any changes if an error occurs
-        conn.close()
-        return False
-
-def list_appointments(client_name: str):
+    with get_conn() as conn:
+        try:
+            # One atomic statement: the UNIQUE index on appointment_datetime
+            # rejects double bookings, so no separate conflict SELECT (and no
+            # race window between check and insert) is needed. The connection
+            # context manager commits on success and rolls back on exception.
+            with conn:
+                cursor = conn.execute("""
+                    INSERT OR IGNORE INTO appointments (client_name, appointment_datetime, duration_minutes, booked_at, email)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (client_name, appointment_iso, duration, booked_at_iso, client_email))
+            if cursor.rowcount == 0:
+                logger.info("Conflict detected for %s during add operation.", appointment_iso)
+                return False # Slot is already booked
+
+            _avail_cache_invalidate(appointment_iso)
+            logger.info("Appointment added for %s at %s", client_name, appointment_iso)
+            return True
+        except Exception as e:
+            logger.error("Error adding appointment: %s", e)
+            return False
+
+def list_appointments(client_name: str) -> list[str]:
     """
-    Performs a query to retrieve a client's appointments.
+    Retrieves a client's appointment datetimes in chronological order.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # Query appointments that *start* within the range
-    cursor.execute("""
-        SELECT client_name, appointment_datetime 
-        FROM appointments
-        WHERE client_name = ?
-        """, [client_name])
-    booked_slots = {row['appointment_datetime'] for row in cursor.fetchall()}
-    conn.close()
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        # The composite index on (client_name, appointment_datetime) serves
+        # both the lookup and the ordering, so no sort step is needed.
+        cursor.execute("""
+            SELECT appointment_datetime
+            FROM appointments
+            WHERE client_name = ?
+            ORDER BY appointment_datetime
+            """, [client_name])
+        booked_slots = [row['appointment_datetime'] for row in cursor.fetchall()]
     return booked_slots
 
-def update_appointment_in_db(client_name: str, old_datetime_iso: str, new_datetime_iso: str) -> bool:
+class UpdateStatus(Enum):
+    """Outcome of try_update_appointment."""
+    OK = auto()
+    OUTSIDE_HOURS = auto()
+    CONFLICT = auto()
+    NOT_FOUND = auto()
+
+def try_update_appointment(client_name: str, old_datetime_iso: str, new_datetime_iso: str) -> UpdateStatus:
     """
-    Updates an existing appointment to a new datetime in the database.
+    Validates and moves an appointment in a single DB round-trip.
 
-    Checks:
-    1. If an appointment exists for the client at the old datetime.
-    2. If the new datetime slot is already booked by ANYONE.
+    Folds the working-hours check (pure Python), the new-slot conflict check
+    and the update itself into one call, so callers don't issue three serial
+    queries — and so no other booking can take the new slot between the
+    check and the update.
 
     Args:
         client_name: The name of the client whose appointment is being changed.
@@ -150,81 +285,70 @@ def update_appointment_in_db(client_name: str, old_datetime_iso: str, new_dateti
         new_datetime_iso: The ISO timestamp string for the desired new appointment time.
 
     Returns:
-        True if the update was successful, False otherwise.
+        An UpdateStatus describing the outcome.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    updated = False
-    print(f"DB: Attempting to update appointment for '{client_name}' from '{old_datetime_iso}' to '{new_datetime_iso}'")
-
-    try:
-        # 1. Check if the *new* slot is already taken (by anyone)
-        cursor.execute("SELECT id FROM appointments WHERE appointment_datetime = ?", (new_datetime_iso,))
-        existing_at_new_time = cursor.fetchone()
-        if existing_at_new_time:
-            print(f"DB Error: Cannot update. The new slot {new_datetime_iso} is already booked.")
-            return False # New slot is already booked
-
-        # 2. Find the original appointment ID for the specific client and time
-        cursor.execute("""
-            SELECT id FROM appointments
-            WHERE client_name = ? AND appointment_datetime = ?
-            """, (client_name, old_datetime_iso))
-        original_appointment = cursor.fetchone()
-
-        if original_appointment:
-            original_id = original_appointment['id']
-            print(f"DB: Found original appointment ID: {original_id}. Proceeding with update.")
-            # 3. Perform the update
-            cursor.execute("""
+    logger.debug("DB: Attempting to update appointment for '%s' from '%s' to '%s'",
+                 client_name, old_datetime_iso, new_datetime_iso)
+
+    if not is_slot_within_working_hours(datetime.fromisoformat(new_datetime_iso)):
+        return UpdateStatus.OUTSIDE_HOURS
+
+    with get_conn() as conn:
+        # One atomic statement: matches the client's original appointment
+        # and only moves it if nobody holds the new slot, so there is no
+        # race window between check and update. The connection context
+        # manager commits on success and rolls back on exception.
+        with conn:
+            cursor = conn.execute("""
                 UPDATE appointments
                 SET appointment_datetime = ?
-                WHERE id = ?
-            """, (new_datetime_iso, original_id))
-            conn.commit()
-
-            # Verify update (optional but good)
-            if cursor.rowcount > 0:
-                print(f"DB: Successfully updated appointment ID {original_id} to {new_datetime_iso}")
-                updated = True
-            else:
-                print(f"DB Warning: Update command affected 0 rows for ID {original_id}.") # Should not happen if found previously
-
-        else:
-            print(f"DB Error: Original appointment for '{client_name}' at '{old_datetime_iso}' not found.")
-            updated = False
+                WHERE client_name = ? AND appointment_datetime = ?
+                  AND NOT EXISTS (
+                      SELECT 1 FROM appointments WHERE appointment_datetime = ?
+                  )
+            """, (new_datetime_iso, client_name, old_datetime_iso, new_datetime_iso))
+
+        if cursor.rowcount > 0:
+            _avail_cache_invalidate(old_datetime_iso, new_datetime_iso)
+            logger.info("DB: Successfully updated appointment for '%s' to %s", client_name, new_datetime_iso)
+            return UpdateStatus.OK
+
+        # Only the failure path pays for a diagnostic round-trip
+        cursor = conn.execute("SELECT 1 FROM appointments WHERE appointment_datetime = ? LIMIT 1", (new_datetime_iso,))
+        if cursor.fetchone():
+            logger.warning("DB Error: Cannot update. The new slot %s is already booked.", new_datetime_iso)
+            return UpdateStatus.CONFLICT
+        logger.warning("DB Error: Original appointment for '%s' at '%s' not found.", client_name, old_datetime_iso)
+        return UpdateStatus.NOT_FOUND
 
+def update_appointment_in_db(client_name: str, old_datetime_iso: str, new_datetime_iso: str) -> bool:
+    """Boolean wrapper around try_update_appointment for callers that don't
+    need to distinguish failure modes."""
+    try:
+        return try_update_appointment(client_name, old_datetime_iso, new_datetime_iso) is UpdateStatus.OK
     except sqlite3.Error as e:
-        print(f"DB Error during update process: {e}")
-        conn.rollback() # Rollback changes on error
-        updated = False
+        logger.error("DB Error during update process: %s", e)
+        return False
     except Exception as e:
-        print(f"General Error during update process: {e}")
-        conn.rollback()
-        updated = False
-    finally:
-        conn.close()
-
-    return updated
+        logger.error("General Error during update process: %s", e)
+        return False
 
 
 def delete_appointment_from_db(appointment_datetime: str, client_name: str):
     """
     Deletes an appointment based on its datetime.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "DELETE FROM appointments WHERE appointment_datetime = ? AND client_name = ?",
-            (appointment_datetime, client_name))
-        deleted = True
-    except sqlite3.Error as e:
-        print(f"DB Error during update process: {e}")
-        conn.rollback()  # Rollback changes on error
-        deleted = False
-    finally:
-        conn.close()
+    with get_conn() as conn:
+        try:
+            with conn:
+                conn.execute(
+                    "DELETE FROM appointments WHERE appointment_datetime = ? AND client_name = ?",
+                    (appointment_datetime, client_name))
+            _avail_cache_invalidate(appointment_datetime)
+            deleted = True
+        except sqlite3.Error as e:
+            logger.error("DB Error during delete process: %s", e)
+            deleted = False
 
     return deleted
 
@@ -250,11 +374,12 @@ def is_slot_within_working_hours(dt_obj: datetime) -> bool:
 
 def is_slot_already_booked(dt_iso: str) -> bool:
     """Checks if a specific ISO datetime string is already booked."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM appointments WHERE appointment_datetime = ?", (dt_iso,))
-    result = cursor.fetchone()
-    conn.close()
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        # Existence check only: SELECT 1 ... LIMIT 1 lets SQLite stop at the
+        # first index hit without loading the rowid.
+        cursor.execute("SELECT 1 FROM appointments WHERE appointment_datetime = ? LIMIT 1", (dt_iso,))
+        result = cursor.fetchone()
     return result is not None
 
 def get_appointments_for_date(target_date: date) -> list[dict]:
@@ -269,34 +394,31 @@ def get_appointments_for_date(target_date: date) -> list[dict]:
         (e.g., {'client_name': '...', 'appointment_datetime': 'ISO_string', 'duration_minutes': ...}).
         Returns an empty list if no appointments are found or an error occurs.
     """
-    conn = get_db_connection()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
     appointments = []
-    start_dt = datetime.combine(target_date, time.min) # Midnight start
-    end_dt = datetime.combine(target_date, time.max) # End of day
-
-    print(f"DB: Querying appointments for date: {target_date.isoformat()}")
-    try:
-        cursor.execute("""
-            SELECT client_name, appointment_datetime, duration_minutes, email
-            FROM appointments
-            WHERE appointment_datetime >= ? AND appointment_datetime <= ?
-            ORDER BY appointment_datetime ASC
-        """, (start_dt.isoformat(), end_dt.isoformat())) 
+    # The column stores ISO-8601 TEXT, which sorts lexicographically, so the
+    # day bounds are plain string concatenations — no datetime.combine needed.
+    prefix = target_date.isoformat()
+    start_iso = prefix + "T00:00:00"
+    end_iso = prefix + "T23:59:59.999999"
+
+    logger.debug("DB: Querying appointments for date: %s", target_date)
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT client_name, appointment_datetime, duration_minutes, email
+                FROM appointments
+                WHERE appointment_datetime >= ? AND appointment_datetime <= ?
+                ORDER BY appointment_datetime ASC
+            """, (start_iso, end_iso))
 
-        for row in cursor.fetchall():
-            appointments.append(dict(row))
+            for row in cursor.fetchall():
+                appointments.append(dict(row))
 
-        print(f"DB: Found {len(appointments)} appointments for {target_date.isoformat()}.")
+            logger.debug("DB: Found %d appointments for %s.", len(appointments), target_date)
 
-    except sqlite3.Error as e:
-        print(f"DB Error in get_appointments_for_date for {target_date.isoformat()}: {e}")
-    except Exception as e:
-        print(f"General Error in get_appointments_for_date for {target_date.isoformat()}: {e}")
-    finally:
-        if conn:
-            conn.close()
+        except sqlite3.Error as e:
+            logger.error("DB Error in get_appointments_for_date for %s: %s", target_date, e)
+        except Exception as e:
+            logger.error("General Error in get_appointments_for_date for %s: %s", target_date, e)
     return appointments
-
-initialize_database()
@@ -1,5 +1,7 @@
+import asyncio
 import logging
 import os
+from collections import OrderedDict
 
 import telegram
 from dotenv import load_dotenv
@@ -9,7 +11,7 @@ from telegram.error import BadRequest
 from telegram.ext import (Application, CommandHandler, ContextTypes,
                           MessageHandler, filters)
 
-from agent_setup import create_agent_executor, create_memory
+from agent_setup import SlotMemory, create_agent_executor, create_memory
 from database import initialize_database  # Ensure DB is ready
 # Import project components
 from llm_setup import get_llm
@@ -27,47 +29,55 @@ logging.basicConfig(
 logging.getLogger("httpx").setLevel(logging.WARNING) # Reduce noisy logging from http client
 logger = logging.getLogger(__name__)
 
-# --- Global LLM instance (initialize once) ---
-try:
-    LLM = get_llm()
-except ValueError as e:
-    logger.error(f"Failed to initialize LLM: {e}")
-    LLM = None # Set LLM to None if initialization fails
+# --- Global LLM instance ---
+# Initialized in main() rather than at import, so importing this module
+# (tests, tooling) doesn't block on an OpenAI/Ollama handshake.
+LLM = None
 
-# --- Store agent executors and memory per chat_id ---
-# Use context.chat_data provided by python-telegram-bot for per-chat storage
-# context.chat_data is a dict unique to each chat
+# --- Shared executor, per-chat memory ---
+# The executor itself is stateless across chats (history is passed per
+# invocation), so one process-wide instance serves everyone instead of one
+# executor per chat_id. Only the cheap per-chat state — conversation memory
+# and SlotMemory — is retained, in a bounded LRU so idle chats get evicted
+# and memory use stays flat under many users.
 
-AGENT_EXECUTOR_KEY = 'agent_executor'
-AGENT_MEMORY_KEY = 'agent_memory'
+MAX_ACTIVE_CHATS = 128
 
-def get_agent_for_chat(context: ContextTypes.DEFAULT_TYPE):
-    """Gets or creates an agent executor and memory for the current chat."""
-    if AGENT_EXECUTOR_KEY not in context.chat_data:
-        logger.info(f"Creating new agent executor for chat_id: {context._chat_id}")
+_AGENT_EXECUTOR = None
+_CHAT_STATE: "OrderedDict[int, tuple]" = OrderedDict()
+
+def get_agent_executor():
+    """Returns the process-wide agent executor, creating it on first use."""
+    global _AGENT_EXECUTOR
+    if _AGENT_EXECUTOR is None:
+        if LLM is None:
+            raise RuntimeError("LLM is not initialized. Cannot create agent.")
+        logger.info("Creating shared agent executor")
+        _AGENT_EXECUTOR = create_agent_executor(LLM)
+    return _AGENT_EXECUTOR
+
+def get_chat_state(chat_id: int):
+    """Returns (memory, slot_memory) for a chat, creating and LRU-evicting as needed."""
+    state = _CHAT_STATE.get(chat_id)
+    if state is None:
+        logger.info(f"Creating new chat state for chat_id: {chat_id}")
         if LLM is None:
-             raise RuntimeError("LLM is not initialized. Cannot create agent.")
-        memory = create_memory()
-        agent_executor = create_agent_executor(LLM) # Create the agent structure
-        context.chat_data[AGENT_MEMORY_KEY] = memory
-        context.chat_data[AGENT_EXECUTOR_KEY] = agent_executor # Store the executor
-    # Retrieve memory and agent
-    memory = context.chat_data[AGENT_MEMORY_KEY]
-    agent_executor = context.chat_data[AGENT_EXECUTOR_KEY]
-    # Link the current memory instance to the agent executor for this run
-    agent_executor.memory = memory
-    return agent_executor
+            raise RuntimeError("LLM is not initialized. Cannot create agent.")
+        state = (create_memory(LLM), SlotMemory())
+        _CHAT_STATE[chat_id] = state
+    _CHAT_STATE.move_to_end(chat_id)
+    while len(_CHAT_STATE) > MAX_ACTIVE_CHATS:
+        evicted_id, _ = _CHAT_STATE.popitem(last=False)
+        logger.info(f"Evicted idle chat state for chat_id: {evicted_id}")
+    return state
 
 # --- Telegram Command Handlers ---
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Sends a welcome message when the /start command is issued."""
     user_name = update.message.from_user.first_name
-    # Clear previous agent state for this chat on /start
-    if AGENT_EXECUTOR_KEY in context.chat_data:
-        del context.chat_data[AGENT_EXECUTOR_KEY]
-    if AGENT_MEMORY_KEY in context.chat_data:
-        del context.chat_data[AGENT_MEMORY_KEY]
+    # Clear previous chat state (memory + slots) for this chat on /start
+    if _CHAT_STATE.pop(update.message.chat_id, None) is not None:
         logger.info(f"Cleared agent state for chat_id: {update.message.chat_id}")
 
     await update.message.reply_text(f'Hello {user_name}! I am AppointmentBot. How can I help you book an appointment today?')
@@ -105,12 +115,31 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"Received message from chat_id {chat_id}: {user_input}")
 
     try:
-        agent_executor = get_agent_for_chat(context)
+        agent_executor = get_agent_executor()
+        memory, slot_memory = get_chat_state(chat_id)
         await context.bot.send_chat_action(chat_id=chat_id, action=telegram.constants.ChatAction.TYPING)
 
         logger.debug(f"Invoking agent for chat {chat_id} with input: '{user_input}'")
-        response = await agent_executor.ainvoke({"input": user_input})
+        # History is passed per invocation (and saved back below) instead of
+        # mutating agent_executor.memory, which would race across chats.
+        chat_history = memory.load_memory_variables({}).get("chat_history", [])
+        response = await agent_executor.ainvoke(
+            {
+                "input": user_input,
+                "chat_history": chat_history,
+                "known_slots": slot_memory.summary_line()
+            },
+            slot_memory=slot_memory
+        )
         ai_response = response.get('output', "Sorry, I didn't get a valid response.")
+        # save_context prunes the buffer, which calls the summarizer LLM once
+        # the token limit is hit — run it on a thread so that round-trip
+        # never stalls the event loop (and with it every other chat).
+        await asyncio.to_thread(
+            memory.save_context, {"input": user_input}, {"output": ai_response})
+        # Harvest tool arguments (client name/email, last viewed date) so the
+        # agent can pre-fill them on later turns instead of re-asking.
+        slot_memory.update_from_steps(response.get('intermediate_steps'))
         logger.debug(f"Agent raw response for chat {chat_id}: '{ai_response}'")
 
         try:
@@ -142,15 +171,23 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 def main() -> None:
     """Starts the Telegram bot."""
+    global LLM
+
     if not TELEGRAM_BOT_TOKEN:
         logger.error("FATAL: TELEGRAM_BOT_TOKEN environment variable not set.")
         return
 
+    try:
+        LLM = get_llm()
+    except ValueError as e:
+        logger.error(f"Failed to initialize LLM: {e}")
+        LLM = None
+
     if LLM is None:
         logger.error("FATAL: LLM could not be initialized. Check API keys/Ollama setup. Bot cannot start.")
         return
 
-    # Initialize database explicitly on start, although import does it too
+    # Initialize database explicitly on start (no longer done at import)
     initialize_database()
 
     # Create the Telegram Application and pass it the bot's token.
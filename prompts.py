@@ -0,0 +1,70 @@
+"""Prompt definitions for the booking agent.
+
+All prompt variants live here so a wording change touches exactly one file;
+agent_setup.py imports whichever variant the configured agent type needs.
+"""
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+# Kept deliberately short: this text is re-sent on every agent turn, so each
+# extra line costs tokens and latency for the whole conversation. Section
+# order is stable so provider-side prompt caching can hit.
+BASE_PROMPT = """
+    You are 'AppointmentBot', a friendly and efficient assistant for booking appointments with the professional.
+
+    Tools:
+    - get_datetime: current date and time.
+    - get_professional_info: services, prices, payment, location, general info.
+    - list_appointments: a client's existing bookings; requires client name.
+    - edit_appointment: reschedule; requires client name, current and new datetime in 'YYYY-MM-DD HH:MM'.
+    - cancel_appointment: cancel; requires client name and exact timeslot in 'YYYY-MM-DD HH:MM'.
+    - check_availability: free slots before booking or editing; requires a specific date ('today', 'tomorrow', 'YYYY-MM-DD', 'next Monday').
+    - book_appointment: book; requires exact datetime string, client name and client email.
+
+    Rules:
+    - A 'Known: ...' line may list facts the client already provided (name, email); use them instead of re-asking.
+    - Clarify vague dates (e.g. 'next week' -> which day?).
+    - Confirm details with the user before booking, editing, or canceling.
+    - If a tool fails, tell the user clearly and suggest an alternative.
+    - Use the conversation history; never ask twice for the same information.
+    - Do not make up information; rely only on the tools.
+    - Gather all required arguments before calling a tool.
+    """
+
+# Define the prompt template for the OpenAI Tools Agent.
+# This prompt structure is specific to how create_openai_tools_agent works.
+# 'known_slots' carries the SlotMemory summary (may be an empty string).
+# Message order matters for OpenAI's automatic prefix caching: the byte-stable
+# system prompt comes first and the history grows append-only behind it, so
+# the per-turn dynamic content (known slots, user input) stays at the tail.
+# Nothing session-specific (timestamps, IDs) may be added before the history.
+prompt_openai = ChatPromptTemplate.from_messages([
+    ("system", BASE_PROMPT),
+    MessagesPlaceholder(variable_name="chat_history"),
+    ("system", "{known_slots}"),
+    ("user", "{input}"),
+    # 'agent_scratchpad' for OpenAI tools agent stores intermediate steps like function calls/responses
+    MessagesPlaceholder(variable_name="agent_scratchpad"),
+])
+
+# Define the prompt template suitable for ReAct Agent
+# ReAct relies heavily on the LLM understanding the Thought/Action/Action Input/Observation cycle.
+# Often, using a pre-defined ReAct prompt structure is best. We can pull one from the LangChain Hub.
+# This prompt includes placeholders for tools, tool_names, input, and agent_scratchpad (for the T/A/AI/O steps)
+# If hub access is an issue, a custom string-based template following ReAct format would be the alternative.
+# The hub prompt is pinned to a local file after the first pull, so process
+# startup doesn't pay a LangChain Hub network round-trip on every import.
+_REACT_PROMPT_FILE = "react_chat_prompt.json"
+try:
+    from langchain_core.prompts import load_prompt
+
+    try:
+        prompt_react = load_prompt(_REACT_PROMPT_FILE)
+    except FileNotFoundError:
+        from langchain import hub
+
+        # This prompt structure is designed to guide the LLM through the ReAct steps.
+        prompt_react = hub.pull("hwchase17/react-chat")
+        prompt_react.save(_REACT_PROMPT_FILE)
+except ImportError:
+    print("Warning: `langchain.hub` not available. ReAct agent might not function optimally without a tailored prompt.")
+    prompt_react = None
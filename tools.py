@@ -1,30 +1,149 @@
+import atexit
 import json
+import logging
 import os
 import smtplib
+import ssl
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import date, datetime, timedelta
-from email import encoders
-from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from functools import lru_cache
 
 import dateparser
 from dotenv import load_dotenv
-from ics import Attendee, Calendar, Event
 from langchain.tools import tool
 
-from database import (APPOINTMENT_DURATION_MINUTES, add_appointment,
+from database import (APPOINTMENT_DURATION_MINUTES, WORKING_HOURS,
+                      UpdateStatus, add_appointment,
                       delete_appointment_from_db, find_available_slots,
-                      is_slot_already_booked, is_slot_within_working_hours,
-                      list_appointments, update_appointment_in_db)
-
-load_dotenv()
-
-PROFESSIONAL_EMAIL = os.getenv("PROFESSIONAL_EMAIL")
-PROFESSIONAL_NAME = os.getenv("PROFESSIONAL_NAME")
-SMTP_SERVER = os.getenv("SMTP_SERVER")
-SMTP_PORT = os.getenv("SMTP_PORT")
-SMTP_USER = os.getenv("SMTP_USER")
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+                      list_appointments, try_update_appointment)
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class _Config:
+    """Snapshot of the email/professional settings, read once per process."""
+    professional_email: str
+    professional_name: str
+    smtp_server: str
+    smtp_port: str
+    smtp_user: str
+    smtp_password: str
+    smtp_use_ssl: bool
+    smtp_configured: bool # All SMTP settings present; computed once in _cfg()
+
+@lru_cache(maxsize=1)
+def _cfg() -> _Config:
+    """Loads .env and the related env vars exactly once, on first use.
+
+    Re-imports (dev hot-reload, tests) previously re-parsed .env and re-read
+    six env vars at module scope; the cache confines that to one call.
+    """
+    load_dotenv()
+    professional_email = os.getenv("PROFESSIONAL_EMAIL")
+    smtp_server = os.getenv("SMTP_SERVER")
+    smtp_port = os.getenv("SMTP_PORT")
+    smtp_user = os.getenv("SMTP_USER")
+    smtp_password = os.getenv("SMTP_PASSWORD")
+    return _Config(
+        professional_email=professional_email,
+        professional_name=os.getenv("PROFESSIONAL_NAME"),
+        smtp_server=smtp_server,
+        smtp_port=smtp_port,
+        smtp_user=smtp_user,
+        smtp_password=smtp_password,
+        smtp_use_ssl=os.getenv("SMTP_USE_SSL", "").lower() == "true",
+        smtp_configured=all([professional_email, smtp_server, smtp_port,
+                             smtp_user, smtp_password]),
+    )
+
+# One long-lived SMTP connection shared across bookings: the TLS handshake
+# and login dominate the cost of sending a single small message, so
+# reconnecting per email wastes most of the wall time. Tool calls run on
+# worker threads, so access is serialized by a lock; the connection is
+# health-checked with NOOP and rebuilt when the server has dropped it.
+_SMTP_LOCK = threading.Lock()
+_SMTP_MAX_MESSAGES = 1000 # Recycle before hitting provider per-connection caps
+_smtp_conn = None
+_smtp_messages_sent = 0
+
+def _connect_smtp() -> smtplib.SMTP:
+    cfg = _cfg()
+    port = int(cfg.smtp_port)
+    if port == 465 or cfg.smtp_use_ssl:
+        # Implicit TLS: one handshake + EHLO instead of the
+        # EHLO/STARTTLS/EHLO dance, halving the setup round-trips.
+        server = smtplib.SMTP_SSL(cfg.smtp_server, port,
+                                  context=ssl.create_default_context())
+        server.ehlo() # Identify client to ESMTP server
+    else:
+        server = smtplib.SMTP(cfg.smtp_server, port)
+        server.ehlo() # Identify client to ESMTP server
+        server.starttls() # Encrypt connection
+        server.ehlo() # Re-identify client over encrypted connection
+    server.login(cfg.smtp_user, cfg.smtp_password)
+    return server
+
+def _get_smtp() -> smtplib.SMTP:
+    """Returns a healthy shared SMTP connection. Caller must hold _SMTP_LOCK."""
+    global _smtp_conn
+    if _smtp_conn is not None:
+        if _smtp_messages_sent >= _SMTP_MAX_MESSAGES:
+            _close_smtp() # Worn out; reconnect below
+        else:
+            try:
+                if _smtp_conn.noop()[0] == 250:
+                    return _smtp_conn
+            except (smtplib.SMTPException, OSError):
+                pass
+            _close_smtp()
+    _smtp_conn = _connect_smtp()
+    return _smtp_conn
+
+def _close_smtp():
+    global _smtp_conn, _smtp_messages_sent
+    if _smtp_conn is not None:
+        try:
+            _smtp_conn.quit()
+        except Exception:
+            pass # Already gone; nothing to clean up
+        _smtp_conn = None
+    _smtp_messages_sent = 0
+
+def _smtp_send(recipients: list, flat_msg: str):
+    """Sends one message over the shared connection, retrying once if dropped."""
+    global _smtp_messages_sent
+    smtp_user = _cfg().smtp_user
+    with _SMTP_LOCK:
+        try:
+            _get_smtp().sendmail(smtp_user, recipients, flat_msg)
+        except smtplib.SMTPServerDisconnected:
+            # Server dropped the idle connection between bookings;
+            # rebuild once and retry before giving up.
+            _close_smtp()
+            _get_smtp().sendmail(smtp_user, recipients, flat_msg)
+        _smtp_messages_sent += 1
+
+atexit.register(_close_smtp)
+
+# Confirmation emails are sent off the booking tool's critical path: the
+# SMTP round-trips are seconds of wall time the user would otherwise spend
+# staring at a typing indicator. Two workers are plenty for one mailbox;
+# shutdown(wait=True) drains any queued sends on exit.
+_email_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="email")
+atexit.register(_email_pool.shutdown, wait=True)
+
+def _send_confirmation_email_background(appointment_details: dict):
+    """Runs the email send on a worker thread, logging the outcome."""
+    try:
+        status = send_confirmation_email_internal(appointment_details)
+        logger.info("Internal: Email worker: %s", status)
+    except Exception as e:
+        logger.error("Internal: Email worker failed: %s", e)
 
 @tool
 def get_datetime():
@@ -44,11 +163,11 @@ def cancel_appointment(parsed_datetime: str, client_name: str):
     The date and time needs to be provided to the tool in this format: YYYY-MM-DD HH:MM. If the user provides it
     in a different format transform it in the above format before calling the tool.
     """
-    print(f"Tool: Cancel Appointment for query: {parsed_datetime}")
+    logger.debug("Tool: Cancel Appointment for query: %s", parsed_datetime)
 
     try:
-        appointment_dt = datetime.strptime(parsed_datetime, '%Y-%m-%d %H:%M')
-        formatted_datetime = appointment_dt.strftime('%Y-%m-%d %H:%M')
+        appointment_dt = _parse_dt(parsed_datetime.strip())
+        formatted_datetime = _fmt_hm(appointment_dt)
 
     except ValueError:
         return f"Error: Invalid datetime format '{parsed_datetime}'. Please use 'YYYY-MM-DD HH:MM' format."
@@ -58,6 +177,64 @@ def cancel_appointment(parsed_datetime: str, client_name: str):
         return "Appointment has been successfully deleted!"
     return "There was an error in the appointment cancellation, please try again."
 
+# dateparser tries locale detection and several relative-date grammars per
+# call, which costs hundreds of milliseconds. The agent almost always passes
+# 'YYYY-MM-DD' (the format the prompt asks for) or a plain keyword, which
+# need none of that; the full parser stays as a fallback for free-form
+# input, pinned to English so it skips the locale scan and built only once.
+_RELATIVE_DAYS = {"today": 0, "tomorrow": 1, "day after tomorrow": 2}
+_date_parser = None
+
+# strftime routes through locale-aware machinery even for fixed layouts;
+# the numeric formats are inlined as f-strings and the name-bearing ones
+# index these tuples instead of dispatching %A/%B per call.
+_WEEKDAY = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday",
+            "Saturday", "Sunday")
+_MONTH = ("", "January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December")
+
+def _fmt_hm(dt: datetime) -> str:
+    """Formats 'YYYY-MM-DD HH:MM'."""
+    return f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d} {dt.hour:02d}:{dt.minute:02d}"
+
+def _fmt_readable_date(d) -> str:
+    """Formats 'Monday, July 15, 2025' (the reply style strftime('%A, %B %d, %Y') gave)."""
+    return f"{_WEEKDAY[d.weekday()]}, {_MONTH[d.month]} {d.day:02d}, {d.year}"
+
+def _fmt_readable_dt(dt: datetime) -> str:
+    """Formats 'Monday, July 15, 2025 at 02:00 PM'."""
+    hour12 = dt.hour % 12 or 12
+    ampm = "AM" if dt.hour < 12 else "PM"
+    return f"{_fmt_readable_date(dt)} at {hour12:02d}:{dt.minute:02d} {ampm}"
+
+@lru_cache(maxsize=1024)
+def _parse_dt(s: str) -> datetime:
+    """Parses 'YYYY-MM-DD HH:MM', memoized.
+
+    The same timestamp string typically crosses several tools within one
+    conversation (check, book, confirm), and strptime re-runs its format
+    machinery on every call; the cache makes repeats a dict hit.
+    """
+    return datetime.strptime(s, '%Y-%m-%d %H:%M')
+
+def _parse_date_query(date_query: str):
+    """Parses a date query, trying the cheap exact formats before dateparser."""
+    query = date_query.strip().lower()
+    try:
+        return datetime.strptime(query, "%Y-%m-%d")
+    except ValueError:
+        pass
+    days_ahead = _RELATIVE_DAYS.get(query)
+    if days_ahead is not None:
+        return datetime.combine(date.today() + timedelta(days=days_ahead),
+                                datetime.min.time())
+    global _date_parser
+    if _date_parser is None:
+        _date_parser = dateparser.DateDataParser(
+            languages=['en'],
+            settings={'PREFER_DATES_FROM': 'future', 'STRICT_PARSING': False})
+    return _date_parser.get_date_data(date_query).date_obj
+
 @tool
 def check_availability(date_query: str) -> str:
     """
@@ -67,35 +244,33 @@ def check_availability(date_query: str) -> str:
     Do not use relative times like 'afternoon' or 'morning', ask the user for a specific date.
     Returns a list of available slots in 'YYYY-MM-DD HH:MM' format or a message indicating unavailability.
     """
-    print(f"Tool: Checking availability for query: {date_query}")
-    parsed_date = dateparser.parse(date_query,
-                                   settings={
-                                       'PREFER_DATES_FROM': 'future',
-                                       'STRICT_PARSING': False
-                                   })
+    logger.debug("Tool: Checking availability for query: %s", date_query)
+    parsed_date = _parse_date_query(date_query)
 
     if not parsed_date:
         return f"Sorry, I couldn't understand the date '{date_query}'. Please provide a specific date like 'tomorrow', 'next Monday', or 'YYYY-MM-DD'."
 
     target_date = parsed_date.date()
-    print(f"Tool: Parsed date query '{date_query}' to: {target_date}")
+    logger.debug("Tool: Parsed date query '%s' to: %s", date_query, target_date)
 
-    # Ensure we don't check for dates too far in the past unless specified explicitly
-    if target_date < date.today() and parsed_date.strftime(
-            '%Y%m%d') == datetime.now().strftime('%Y%m%d'):
-        # If dateparser defaults to today for a time-only query, fine.
-        pass
-    elif target_date < date.today():
+    # Ensure we don't check for dates in the past (time-only queries parse
+    # to today and fall through fine).
+    if target_date < date.today():
         return "Sorry, I can only check availability for today or future dates."
 
+    # Closed days are decided by WORKING_HOURS alone, so answer them here
+    # without the find_available_slots round-trip.
+    if target_date.weekday() not in WORKING_HOURS:
+        return f"Sorry, we are closed on {_fmt_readable_date(target_date)}. Please try a weekday."
+
     available_slots = find_available_slots(parsed_date)
 
     if not available_slots:
-        return f"Sorry, no available slots found for {target_date.strftime('%A, %B %d, %Y')}. Please try another date."
+        return f"Sorry, no available slots found for {_fmt_readable_date(target_date)}. Please try another date."
     else:
         # Limit the number of slots shown?
         slots_str = "\n".join(available_slots)
-        return f"Available slots for {target_date.strftime('%A, %B %d, %Y')}:\n{slots_str}\nPlease specify the exact slot you want to book (e.g., 'Book 2025-04-28 14:00')."
+        return f"Available slots for {_fmt_readable_date(target_date)}:\n{slots_str}\nPlease specify the exact slot you want to book (e.g., 'Book 2025-04-28 14:00')."
 
 
 @tool
@@ -121,12 +296,12 @@ def book_appointment(datetime_str: str, client_name: str, client_email: str) ->
     After a successful booking, the tool confirms the appointment and triggers
     an automated notification email to the client.
     """
-    print(f"Tool: Attempting to book appointment for '{client_name}' at '{datetime_str}'")
+    logger.debug("Tool: Attempting to book appointment for '%s' at '%s'", client_name, datetime_str)
     if not client_name or client_name.strip() == "":
         return "Error: Client name is required to book an appointment."
     try:
         # Validate and parse the datetime string
-        appointment_dt = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M')
+        appointment_dt = _parse_dt(datetime_str.strip())
 
         # Prevent booking past slots
         if appointment_dt < datetime.now():
@@ -143,14 +318,18 @@ def book_appointment(datetime_str: str, client_name: str, client_email: str) ->
         appointment_details = {
             "client_name": client_name,
             "datetime": appointment_dt.isoformat(), # Use ISO for internal consistency
-            "datetime_readable": appointment_dt.strftime('%A, %B %d, %Y at %I:%M %p'),
+            "datetime_readable": _fmt_readable_dt(appointment_dt),
             "duration": APPOINTMENT_DURATION_MINUTES,
             "client_email": client_email
         }
-        # Trigger email sending (can be done here or as a separate step by the agent)
-        email_status = send_confirmation_email_internal(appointment_details)
-
-        return f"Success! Appointment confirmed for {client_name} on {appointment_details['datetime_readable']}. {email_status}"
+        # Trigger email sending in the background so the tool returns as soon
+        # as the booking is committed; send failures are logged, not surfaced.
+        # With SMTP unconfigured (dev/test) skip the queueing entirely.
+        if _cfg().smtp_configured:
+            _email_pool.submit(_send_confirmation_email_background, appointment_details)
+            return f"Success! Appointment confirmed for {client_name} on {appointment_details['datetime_readable']}. A confirmation email is on its way."
+
+        return f"Success! Appointment confirmed for {client_name} on {appointment_details['datetime_readable']}."
     else:
         # The add_appointment function already prints conflict/error messages
         return f"Error: Could not book appointment for {client_name} at {datetime_str}. The slot might have been taken, or another error occurred. Please try checking availability again."
@@ -161,7 +340,7 @@ def list_client_appointments(client_name: str):
     Retrieves the current appointment a client has already booked. Requires the 
     client name to perform the sql query.
     """
-    print(f"Tool: Attempting to list appointment for '{client_name}'")
+    logger.debug("Tool: Attempting to list appointment for '%s'", client_name)
     if not client_name or client_name.strip() == "":
         return "Error: Client name is required to book an appointment."
     success = list_appointments(client_name)
@@ -170,6 +349,52 @@ def list_client_appointments(client_name: str):
     else:
         return f"Error: no booked appointments with the following name: {client_name}"
 
+_PROF_INFO_FILE = "professional_info.json"
+# (mtime, formatted string) — the file is static per deployment, so the
+# read + json.load + formatting pass happens once and only again if the
+# file is edited on disk.
+_prof_info_cache = None
+
+def _format_professional_info(data: dict) -> str:
+    """Formats the professional-info dict into a readable string for the LLM/user."""
+    info_parts = [
+        f"--- Information about {data.get('professional_name', 'the professional')} ---",
+        f"Specialty: {data.get('specialty', 'N/A')}",
+        f"Location: {data.get('location', 'N/A')}",
+        f"Contact (non-booking): {data.get('contact_info', 'N/A')}",
+    ]
+    if 'services' in data and data['services']:
+        info_parts.append("\nServices Offered:")
+        for service in data['services']:
+            name = service.get('name', 'Unnamed Service')
+            price = f" - Price: {service.get('price', 'N/A')}"
+            duration = f" - Duration: approx. {service.get('duration_minutes', 'N/A')} min" if service.get('duration_minutes') else ""
+            desc = f" - Desc: {service.get('description', '')}" if service.get('description') else ""
+            info_parts.append(f"  - {name}\n    {price}{duration}\n    {desc}") # Indented formatting
+
+    info_parts.append(f"\nPayment Info: {data.get('payment_info', 'Please inquire.')}")
+    info_parts.append("\nNote: For exact appointment times, please use the availability checking tool.")
+
+    return "\n".join(info_parts)
+
+def _load_professional_info() -> str:
+    """Returns the formatted info string, re-reading only when the file changes."""
+    global _prof_info_cache
+    mtime = os.path.getmtime(_PROF_INFO_FILE)
+    if _prof_info_cache is not None and _prof_info_cache[0] == mtime:
+        return _prof_info_cache[1]
+    with open(_PROF_INFO_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    text = _format_professional_info(data)
+    _prof_info_cache = (mtime, text)
+    return text
+
+# Warm the cache at import; a missing/broken file is reported per-call.
+try:
+    _load_professional_info()
+except Exception:
+    pass
+
 @tool
 def get_professional_info() -> str:
     """
@@ -178,36 +403,14 @@ def get_professional_info() -> str:
     when the user asks questions about services, costs, what Dr. Demo does,
     or general practice information. Do not use for checking appointment availability.
     """
-    print("Tool: Attempting to retrieve professional info.")
+    logger.debug("Tool: Attempting to retrieve professional info.")
     try:
-        with open("professional_info.json", 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        # Format the data into a readable string for the LLM/user
-        info_parts = [
-            f"--- Information about {data.get('professional_name', 'the professional')} ---",
-            f"Specialty: {data.get('specialty', 'N/A')}",
-            f"Location: {data.get('location', 'N/A')}",
-            f"Contact (non-booking): {data.get('contact_info', 'N/A')}",
-        ]
-        if 'services' in data and data['services']:
-            info_parts.append("\nServices Offered:")
-            for service in data['services']:
-                name = service.get('name', 'Unnamed Service')
-                price = f" - Price: {service.get('price', 'N/A')}"
-                duration = f" - Duration: approx. {service.get('duration_minutes', 'N/A')} min" if service.get('duration_minutes') else ""
-                desc = f" - Desc: {service.get('description', '')}" if service.get('description') else ""
-                info_parts.append(f"  - {name}\n    {price}{duration}\n    {desc}") # Indented formatting
-
-        info_parts.append(f"\nPayment Info: {data.get('payment_info', 'Please inquire.')}")
-        info_parts.append("\nNote: For exact appointment times, please use the availability checking tool.")
-
-        return "\n".join(info_parts)
+        return _load_professional_info()
     except FileNotFoundError:
-        print("Error: professional_info.json not found.")
+        logger.error("Error: professional_info.json not found.")
         return "Sorry, I couldn't find the detailed service information file."
     except Exception as e:
-        print(f"Error reading professional_info.json: {e}")
+        logger.error("Error reading professional_info.json: %s", e)
         return "Sorry, I encountered an error while retrieving service information."
 
 @tool
@@ -221,7 +424,8 @@ def edit_appointment(client_name: str, current_datetime_str: str, new_datetime_s
     Checks if the new slot is available before attempting the update.
     **Do NOT call this tool unless you have gathered ALL THREE arguments from the user.**
     """
-    print(f"Tool: Attempting to edit appointment for '{client_name}' from '{current_datetime_str}' to '{new_datetime_str}'")
+    logger.debug("Tool: Attempting to edit appointment for '%s' from '%s' to '%s'",
+                 client_name, current_datetime_str, new_datetime_str)
 
     if not client_name or not isinstance(client_name, str) or client_name.strip() == "":
         return "Error: Client name is required to edit an appointment."
@@ -229,9 +433,8 @@ def edit_appointment(client_name: str, current_datetime_str: str, new_datetime_s
         return "Error: Both the current and new appointment date/time are required."
 
     try:
-        dt_format = '%Y-%m-%d %H:%M'
-        old_dt_obj = datetime.strptime(current_datetime_str.strip(), dt_format)
-        new_dt_obj = datetime.strptime(new_datetime_str.strip(), dt_format)
+        old_dt_obj = _parse_dt(current_datetime_str.strip())
+        new_dt_obj = _parse_dt(new_datetime_str.strip())
 
         old_dt_iso = old_dt_obj.isoformat()
         new_dt_iso = new_dt_obj.isoformat()
@@ -242,31 +445,90 @@ def edit_appointment(client_name: str, current_datetime_str: str, new_datetime_s
     except ValueError:
         return f"Error: Invalid datetime format. Please use 'YYYY-MM-DD HH:MM' format for both current and new times."
 
-    # --- Check Availability and Validity of NEW Slot ---
-    if not is_slot_within_working_hours(new_dt_obj):
-        return f"Error: The requested new time ({new_datetime_str}) is outside of working hours."
-    if is_slot_already_booked(new_dt_iso):
-        return f"Error: The requested new time slot ({new_datetime_str}) is already booked. Please choose a different time."
+    # --- Validate and move in a single transactional DB call ---
+    # Working-hours, conflict and existence checks run inside
+    # try_update_appointment, so there are no separate pre-check round-trips
+    # (and no window for another booking to take the new slot in between).
     try:
-        update_successful = update_appointment_in_db(client_name.strip(), old_dt_iso, new_dt_iso)
+        status = try_update_appointment(client_name.strip(), old_dt_iso, new_dt_iso)
     except Exception as e:
-        print(f"Error calling database function update_appointment_in_db: {e}")
+        logger.error("Error calling database function try_update_appointment: %s", e)
         return f"Error: Could not reschedule appointment for {client_name.strip()} due to an internal error."
-    if update_successful:
+    if status is UpdateStatus.OK:
         return f"Success! Appointment for {client_name.strip()} rescheduled from {current_datetime_str} to {new_datetime_str}."
-    else:
-        return f"Error: Could not reschedule appointment for {client_name.strip()}. Please ensure the original appointment time ({current_datetime_str}) is correct for this name, and that the new slot is available."
+    if status is UpdateStatus.OUTSIDE_HOURS:
+        return f"Error: The requested new time ({new_datetime_str}) is outside of working hours."
+    if status is UpdateStatus.CONFLICT:
+        return f"Error: The requested new time slot ({new_datetime_str}) is already booked. Please choose a different time."
+    return f"Error: Could not reschedule appointment for {client_name.strip()}. Please ensure the original appointment time ({current_datetime_str}) is correct for this name."
+
+# The invite is a ~15-line RFC 5545 payload; rendering it through a template
+# replaces the ics library's full serializer (attrs classes, Arrow datetimes,
+# line folding) with one str.format call per booking.
+_ICS_TEMPLATE = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    "PRODID:-//AppointMate//Booking Agent//EN\r\n"
+    "METHOD:REQUEST\r\n"
+    "BEGIN:VEVENT\r\n"
+    "UID:{uid}\r\n"
+    "DTSTAMP:{dtstamp}\r\n"
+    "DTSTART:{dtstart}\r\n"
+    "DTEND:{dtend}\r\n"
+    "SUMMARY:{summary}\r\n"
+    "DESCRIPTION:{description}\r\n"
+    "ORGANIZER:mailto:{organizer}\r\n"
+    "ATTENDEE:mailto:{organizer}\r\n"
+    "ATTENDEE:mailto:{attendee}\r\n"
+    "END:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+# RFC 5545 text values must escape backslash, semicolon, comma and newlines;
+# a translate table does that at C speed for the user-supplied fields.
+_ICS_ESC = str.maketrans({"\\": "\\\\", ";": "\\;", ",": "\\,",
+                          "\n": "\\n", "\r": ""})
+# URI values (mailto: addresses) can't carry backslash escapes, so control
+# characters are stripped outright to block header/line injection there.
+_ICS_CTRL = {c: None for c in range(0x20)}
+
+def _ics_text(s: str) -> str:
+    """Escapes a user-supplied value for embedding in an ICS text field."""
+    return s.translate(_ICS_ESC)
+
+def _ics_uri(s: str) -> str:
+    """Strips control characters from a user-supplied value used in a URI field."""
+    return s.translate(_ICS_CTRL)
+
+def _fmt_ics(dt: datetime) -> str:
+    """Formats the compact 'YYYYMMDDTHHMMSS' stamp RFC 5545 uses."""
+    return f"{dt.year:04d}{dt.month:02d}{dt.day:02d}T{dt.hour:02d}{dt.minute:02d}{dt.second:02d}"
+
+def _build_ics(client_name: str, client_email: str, dt_start: datetime,
+               dt_end: datetime, description: str) -> str:
+    """Renders the calendar invite for one appointment as an ICS string."""
+    return _ICS_TEMPLATE.format(
+        uid=uuid.uuid4(),
+        dtstamp=_fmt_ics(datetime.utcnow()) + "Z",
+        dtstart=_fmt_ics(dt_start),
+        dtend=_fmt_ics(dt_end),
+        summary=f"Appointment: {_ics_text(client_name)}",
+        description=_ics_text(description),
+        organizer=_cfg().professional_email,
+        attendee=_ics_uri(client_email),
+    )
 
 # Internal function for email sending, not exposed as a tool directly to the LLM
 # but called by book_appointment. This prevents LLM from trying to call email arbitrary things.
 def send_confirmation_email_internal(appointment_details: dict) -> str:
     """Sends a confirmation email to the professional with appointment details and a calendar invite."""
-    print(f"Internal: Preparing confirmation email for: {appointment_details}")
+    logger.debug("Internal: Preparing confirmation email for: %s", appointment_details)
+    cfg = _cfg()
 
-    # Check if SMTP is configured
-    if not all([PROFESSIONAL_EMAIL, SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASSWORD]):
+    # Check if SMTP is configured before building any MIME/ICS objects
+    if not cfg.smtp_configured:
         msg = f"Email notification skipped: SMTP details not fully configured in .env file."
-        print(msg)
+        logger.warning(msg)
         return msg # Return status message
 
     client_name = appointment_details.get("client_name", "Unknown Client")
@@ -284,16 +546,13 @@ def send_confirmation_email_internal(appointment_details: dict) -> str:
         dt_end = dt_start + timedelta(minutes=duration)
 
         # --- Create Email ---
-        msg = MIMEMultipart('related') # Use related for inline calendar data? Alternative is better.
         msg = MIMEMultipart('alternative')
-        msg['Subject'] = f"New Appointment Booking: {client_name} on {dt_start.strftime('%Y-%m-%d %H:%M')}"
-        msg['From'] = SMTP_USER
-        recipients.append(PROFESSIONAL_EMAIL)
+        msg['Subject'] = f"New Appointment Booking: {client_name} on {_fmt_hm(dt_start)}"
+        msg['From'] = cfg.smtp_user
+        recipients.append(cfg.professional_email)
         if client_email != "No email":
             recipients.append(client_email)
-            msg['To'] = ", ".join(recipients)
-        else:
-            msg['To'] = PROFESSIONAL_EMAIL
+        msg['To'] = ", ".join(recipients)
 
         # --- Email Body ---
         body = f"""
@@ -312,49 +571,37 @@ def send_confirmation_email_internal(appointment_details: dict) -> str:
         """
         msg.attach(MIMEText(body, 'plain'))
 
-        # --- Create ICS File ---
-        cal = Calendar()
-        event = Event()
-        event.name = f"Appointment: {client_name}"
-        event.begin = dt_start
-        event.end = dt_end
-        event.description = f"Appointment with {client_name} booked via automated agent."
-        # event.location = "Optional: Add location"
-        professional_attendee = Attendee(f"mailto:{PROFESSIONAL_EMAIL}")
-        event.attendees.add(professional_attendee)
-        client_attendee = Attendee(f"mailto:{client_email}")
-        event.attendees.add(client_attendee)
-        cal.events.add(event)
+        # --- Create ICS payload ---
+        ics_payload = _build_ics(
+            client_name, client_email, dt_start, dt_end,
+            f"Appointment with {client_name} booked via automated agent.")
 
         # --- Attach ICS file ---
-        # Use MIMEBase for generic binary data (text/calendar can sometimes be mishandled)
-        ics_filename = f"appointment_{client_name}_{dt_start.strftime('%Y%m%d_%H%M')}.ics"
-        part = MIMEBase('application', "octet-stream") # Or 'text', 'calendar; method=REQUEST'
-        part.set_payload(str(cal).encode('utf-8'))
-        encoders.encode_base64(part)
+        # text/calendar with method=REQUEST is what mail clients expect for an
+        # invite, and it skips the base64 pass (and its ~33% size inflation)
+        # that the old application/octet-stream attachment needed.
+        ics_filename = f"appointment_{client_name}_{_fmt_ics(dt_start)[:13].replace('T', '_')}.ics"
+        part = MIMEText(ics_payload, 'calendar', 'utf-8')
+        part.set_param('method', 'REQUEST')
+        part.set_param('name', ics_filename)
         part.add_header('Content-Disposition', f'attachment; filename="{ics_filename}"')
         msg.attach(part)
 
 
         # --- Send Email to Professional---
-        print(f"Internal: Sending email to {PROFESSIONAL_EMAIL} via {SMTP_SERVER}:{SMTP_PORT}")
-        with smtplib.SMTP(SMTP_SERVER, int(SMTP_PORT)) as server:
-            server.ehlo() # Identify client to ESMTP server
-            server.starttls() # Encrypt connection
-            server.ehlo() # Re-identify client over encrypted connection
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.sendmail(from_addr=SMTP_USER, to_addrs=recipients, msg=msg.as_string()) if client_email != "No email" else server.sendmail(from_addr=SMTP_USER, to_addrs=PROFESSIONAL_EMAIL, msg=msg.as_string())
-            print("Internal: Email sent successfully.")
+        logger.debug("Internal: Sending email to %s via %s:%s", cfg.professional_email, cfg.smtp_server, cfg.smtp_port)
+        _smtp_send(recipients, msg.as_string())
+        logger.info("Internal: Email sent successfully.")
 
-        return f"Confirmation email sent to {PROFESSIONAL_EMAIL}."
+        return f"Confirmation email sent to {cfg.professional_email}."
 
     except smtplib.SMTPAuthenticationError:
         err_msg = "Email Error: SMTP Authentication failed. Check SMTP_USER/SMTP_PASSWORD."
-        print(err_msg)
+        logger.error(err_msg)
         return err_msg
     except Exception as e:
         err_msg = f"Email Error: Failed to send confirmation email: {e}"
-        print(err_msg)
+        logger.error(err_msg)
         return err_msg
 
 # List of tools for the agent (only expose tools safe for LLM calls)